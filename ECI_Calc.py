@@ -1,14 +1,47 @@
 # ECI_Calc.py
 
+import hashlib
+import hmac
+import threading
+import time
+from functools import lru_cache
+
+import orjson
 import streamlit as st
+from diskcache import Cache
 import requests
-import yfinance as yf
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+# orjson is much faster than stdlib json for serializing figure payloads.
+pio.json.config.default_engine = 'orjson'
+
+# Shared HTTP session so cache-miss price fetches reuse the TCP/TLS connection
+# instead of paying a full handshake per call.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+))
+
+# Disk-backed L2 for BTC prices, keyed by minute bucket: survives process
+# restarts, which st.cache_data does not.
+_DC = Cache('.btc_cache')
 
 ###############################
 #          LOGIN MODULE       #
 ###############################
+
+# SHA-256 digest of the login password; avoids embedding the plaintext in the
+# source/.pyc and allows a constant-time comparison below.
+_PW_HASH = bytes.fromhex("8cee771e8b0a132f1481437af4ee52c43b33ad6d3c2734226777c6a11eb75978")
+
 def login():
     """
     Simple login function that checks for a fixed password.
@@ -20,133 +53,173 @@ def login():
         st.title("Login")
         password_input = st.text_input("Enter Password:", type="password")
         if st.button("Login"):
-            if password_input == "Bitcoin99!":
+            digest = hashlib.sha256(password_input.encode()).digest()
+            if hmac.compare_digest(digest, _PW_HASH):
                 st.session_state.logged_in = True
+                st.rerun()  # Re-run straight into the app; skips the st.stop below
             else:
                 st.error("Incorrect password!")
         st.stop()  # Stop execution until the user logs in
 
+# Shared plotly.js config: keep charts interactive but skip the mode bar.
+_PLOTLY_CONFIG = {'staticPlot': False, 'displayModeBar': False}
+
+# Fixed deal parameters, hoisted to module scope so they are not rebuilt on
+# every "Evaluate Deal" click.
+_LOAN_PARAMS = {
+    'down_payment_pct': 0.25,       # Down payment as a fraction of condo price
+    'loan_pct': 0.75,               # Loan as a fraction of condo price
+    'annual_interest_rate': 0.10,   # 10%
+    'loan_term_years': 4,
+    'btc_cagr': 0.281,              # 28.1% annual growth rate for BTC
+    'condo_appreciation': 0.04,     # 4% annual appreciation
+}
+
 ###############################
 #       HELPER FUNCTIONS      #
 ###############################
 
-@st.cache_data(ttl=60)  # Cache the price for 60 seconds
+@st.cache_data(ttl=60, show_spinner=False)  # Cache the price for 60 seconds
 def fetch_btc_price():
     """
     Fetches the current BTC price in USD.
     1) Tries Binance first.
     2) Falls back to yfinance if Binance fails.
     Caches the result for 60 seconds to balance API usage vs. freshness.
+    Returns None on failure; callers are responsible for rendering errors
+    (keeping st.* calls out of the cached body avoids caching stale UI messages).
     """
+    # 0. Disk-backed L2: a fresh process (restart, autoscale) can reuse a
+    #    price fetched within the current minute bucket.
+    key = int(time.time() // 60)
+    cached = _DC.get(key)
+    if cached is not None:
+        return cached
+
     # 1. Try Binance first
     try:
         url = "https://api.binance.com/api/v3/ticker/price?symbol=BTCUSDT"
-        response = requests.get(url, timeout=5)
+        response = _SESSION.get(url, timeout=5)
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             current_price = float(data.get("price", 0))
             if current_price != 0:
+                _DC.set(key, current_price, expire=300)
                 return current_price
-            else:
-                st.warning("Binance returned an invalid BTC price. Trying yfinance...")
-        else:
-            st.warning(f"Binance API returned non-200 status: {response.status_code}. Trying yfinance...")
-    except Exception as e:
-        st.warning(f"Binance API failed with error: {e}. Trying yfinance...")
+    except Exception:
+        pass  # Fall through to yfinance
 
-    # 2. Fallback to yfinance
+    # 2. Fallback to yfinance (imported lazily so the happy path never pays
+    #    for its import graph)
     try:
+        import yfinance as yf
         btc = yf.Ticker("BTC-USD")
         data = btc.history(period="1d")
         if not data.empty:
-            current_price = data['Close'].iloc[-1]
-            return float(current_price)
-        else:
-            st.error("yfinance returned empty data.")
-    except Exception as e:
-        st.error(f"Error fetching BTC price from yfinance: {e}")
+            current_price = float(data['Close'].iloc[-1])
+            _DC.set(key, current_price, expire=300)
+            return current_price
+    except Exception:
+        pass
 
     return None
 
+# Warm the price cache off the render path: the first paint no longer blocks
+# on the Binance round-trip, and by the time the user clicks "Refresh BTC
+# Price" the cached value is usually already there.
+threading.Thread(target=fetch_btc_price, daemon=True).start()
+
+@lru_cache(maxsize=128)
 def calculate_annual_payment(loan_amount, annual_rate, years):
-    return loan_amount * (annual_rate * (1 + annual_rate) ** years) / (
-        (1 + annual_rate) ** years - 1
-    )
+    compound = (1 + annual_rate) ** years
+    return loan_amount * (annual_rate * compound) / (compound - 1)
+
+@lru_cache(maxsize=128)
+def _loan_sched_arrays(loan_amount, annual_rate, annual_payment, years):
+    """
+    Closed-form amortization: principal[t] = (A - L*r) * (1+r)**t, so the
+    whole schedule falls out of one vectorized pow plus a cumsum — no
+    per-year loop. Memoized since it is a pure function of scalar inputs.
+    """
+    t = np.arange(years)
+    principal = (annual_payment - loan_amount * annual_rate) * (1 + annual_rate) ** t
+    interest = annual_payment - principal
+    payment = np.full(years, annual_payment)
+    balance = loan_amount - np.cumsum(principal)
+    return payment, interest, principal, balance
 
 def generate_loan_schedule(loan_amount, annual_rate, annual_payment, years):
-    schedule = []
-    remaining_balance = loan_amount
-    for year in range(1, years + 1):
-        interest = remaining_balance * annual_rate
-        principal = annual_payment - interest
-        remaining_balance -= principal
-        schedule.append({
-            'Year': year,
-            'Payment': round(annual_payment, 2),
-            'Interest': round(interest, 2),
-            'Principal': round(principal, 2),
-            'Remaining Balance': round(remaining_balance, 2)
-        })
-    return schedule
-
-def plot_loan_schedule(schedule_df):
-    fig = go.Figure()
+    payment, interest, principal, balance = _loan_sched_arrays(
+        loan_amount, annual_rate, annual_payment, years
+    )
+    return pd.DataFrame({
+        'Year': np.arange(1, years + 1),
+        'Payment': np.round(payment, 2),
+        'Interest': np.round(interest, 2),
+        'Principal': np.round(principal, 2),
+        'Remaining Balance': np.round(balance, 2),
+    })
+
+@st.cache_data(show_spinner=False)
+def plot_deal_overview(sched_years, interest, principal, profit_percentage,
+                       years, net_benefit):
+    """
+    Single three-row figure for the deal-accepted branch: loan breakdown,
+    ECi's profit, and the investor's net benefit. One plotly.js instance
+    instead of three keeps JS init and DOM cost down.
+    """
+    fig = make_subplots(
+        rows=3, cols=1,
+        vertical_spacing=0.1,
+        subplot_titles=(
+            'Loan Payment Breakdown by Year',
+            "ECi's Profit Percentage",
+            "Investor's Net Benefit Over Time"
+        )
+    )
     fig.add_trace(go.Bar(
-        x=schedule_df['Year'],
-        y=schedule_df['Interest'],
+        x=sched_years,
+        y=interest,
         name='Interest',
-        marker_color='indianred'
-    ))
+        marker_color='indianred',
+        hoverinfo='skip'  # values are shown in the schedule table below
+    ), row=1, col=1)
     fig.add_trace(go.Bar(
-        x=schedule_df['Year'],
-        y=schedule_df['Principal'],
+        x=sched_years,
+        y=principal,
         name='Principal',
-        marker_color='lightsalmon'
-    ))
-    fig.update_layout(
-        barmode='stack',
-        title='Loan Payment Breakdown by Year',
-        xaxis_title='Year',
-        yaxis_title='Amount (USD)',
-        legend_title='Components',
-        template='plotly_white'
-    )
-    return fig
-
-def plot_ecis_profit(profit_percentage):
-    fig = go.Figure(go.Bar(
+        marker_color='lightsalmon',
+        hoverinfo='skip'
+    ), row=1, col=1)
+    fig.add_trace(go.Bar(
         x=['ECi Profit'],
         y=[profit_percentage],
-        marker_color='green' if profit_percentage > 0 else 'red'
-    ))
-    fig.update_layout(
-        title="ECi's Profit Percentage",
-        yaxis_title='Profit (%)',
-        xaxis=dict(showticklabels=False),
-        showlegend=False,
-        template='plotly_white',
-        height=400
-    )
-    fig.update_traces(
+        marker_color='green' if profit_percentage > 0 else 'red',
         text=[f"{profit_percentage}%"],
-        textposition='auto'
-    )
-    return fig
-
-def plot_investors_net_benefit(years, net_benefit):
-    fig = go.Figure(go.Scatter(
+        textposition='auto',
+        showlegend=False,
+        hoverinfo='skip'  # the bar is labeled with its own value
+    ), row=2, col=1)
+    fig.add_trace(go.Scattergl(
         x=years,
         y=net_benefit,
         mode='lines+markers',
         name='Net Benefit',
         line=dict(color='purple', width=2)
-    ))
+    ), row=3, col=1)
+    fig.update_xaxes(title_text='Year', row=1, col=1)
+    fig.update_yaxes(title_text='Amount (USD)', row=1, col=1)
+    fig.update_xaxes(showticklabels=False, row=2, col=1)
+    fig.update_yaxes(title_text='Profit (%)', row=2, col=1)
+    fig.update_xaxes(title_text='Year', row=3, col=1)
+    fig.update_yaxes(title_text='Net Benefit (USD)', row=3, col=1)
     fig.update_layout(
-        title="Investor's Net Benefit Over Time",
-        xaxis_title='Year',
-        yaxis_title='Net Benefit (USD)',
+        barmode='stack',
+        legend_title='Components',
         template='plotly_white',
-        height=500
+        height=1200,
+        transition_duration=0,
+        uirevision='static'
     )
     return fig
 
@@ -155,11 +228,11 @@ def plot_investors_net_benefit(years, net_benefit):
 ###############################
 
 def main():
-    # 1. Enforce login
-    login()
-
-    # 2. Set page config
+    # 1. Set page config (must be the first Streamlit call of the script)
     st.set_page_config(page_title="ECi Condo Loan Calculator", layout="centered")
+
+    # 2. Enforce login
+    login()
     st.title("🏢 ECi Condo Loan Calculator 🏦")
     st.markdown("""
         This application helps you determine whether purchasing a condo using your BTC holdings 
@@ -174,6 +247,8 @@ def main():
     # 4. "Refresh BTC Price" button (no experimental_rerun)
     if st.button("Refresh BTC Price"):
         st.session_state['btc_price'] = fetch_btc_price()
+        if st.session_state['btc_price'] is None:
+            st.error("Could not fetch the BTC price from Binance or yfinance. Please try again.")
         # No st.experimental_rerun() call here
 
     # 5. Display current BTC price in the sidebar
@@ -205,67 +280,90 @@ def main():
             st.success("✅ **Deal Accepted:**")
             
             # Loan Details
-            DP = 0.25 * condo_price  # Down Payment
-            L = 0.75 * condo_price   # Loan Amount
-            annual_interest_rate = 0.10  # 10%
-            loan_term_years = 4      # 4 years
-            CAGR = 0.281            # 28.1% annual growth rate for BTC
+            DP = _LOAN_PARAMS['down_payment_pct'] * condo_price  # Down Payment
+            L = _LOAN_PARAMS['loan_pct'] * condo_price           # Loan Amount
+            annual_interest_rate = _LOAN_PARAMS['annual_interest_rate']
+            loan_term_years = _LOAN_PARAMS['loan_term_years']
+            CAGR = _LOAN_PARAMS['btc_cagr']
 
             A = calculate_annual_payment(L, annual_interest_rate, loan_term_years)
             A = round(A, 2)
 
-            # Display Loan Details
+            # Display Loan Details (numeric values; formatting happens client-side)
             st.subheader("💼 Loan Details")
-            loan_details = {
-                "Down Payment (25% of Condo Price)": f"${DP:,.2f}",
-                "Loan Amount (75% of Condo Price)": f"${L:,.2f}",
-                "Annual Interest Rate": f"{annual_interest_rate*100:.2f}%",
-                "Loan Term (Years)": loan_term_years,
-                "Annual Loan Payment": f"${A:,.2f}"
-            }
-            loan_details_df = pd.DataFrame.from_dict(loan_details, orient='index', columns=['Value'])
-            st.table(loan_details_df)
+            loan_details_df = pd.DataFrame(
+                {'Value': [DP, L, annual_interest_rate * 100, loan_term_years, A]},
+                index=[
+                    "Down Payment (USD, 25% of Condo Price)",
+                    "Loan Amount (USD, 75% of Condo Price)",
+                    "Annual Interest Rate (%)",
+                    "Loan Term (Years)",
+                    "Annual Loan Payment (USD)"
+                ],
+            )
+            st.dataframe(loan_details_df, column_config={
+                'Value': st.column_config.NumberColumn(format="%.2f"),
+            })
+
+            # Generate Loan Schedule
+            schedule_df = generate_loan_schedule(L, annual_interest_rate, A, loan_term_years)
 
-            # Generate and Display Loan Schedule
-            schedule = generate_loan_schedule(L, annual_interest_rate, A, loan_term_years)
-            schedule_df = pd.DataFrame(schedule)
-            st.subheader("📅 Loan Schedule")
-            st.plotly_chart(plot_loan_schedule(schedule_df), use_container_width=True)
-            st.dataframe(schedule_df.style.format({
-                "Payment": "${:,.2f}",
-                "Interest": "${:,.2f}",
-                "Principal": "${:,.2f}",
-                "Remaining Balance": "${:,.2f}"
-            }))
-            
             # Calculate ECi's Profit
             total_payments = DP + (A * loan_term_years)
             profit = total_payments - condo_price
             profit_percentage = round((profit / condo_price) * 100, 2)
 
-            # Display ECi's Profit
-            st.subheader("📈 ECi's Profit")
-            st.plotly_chart(plot_ecis_profit(profit_percentage), use_container_width=True)
-            st.write(f"**Total Payments to ECi:** ${total_payments:,.2f}")
-            st.write(f"**ECi's Profit:** ${profit:,.2f} ({profit_percentage}%)")
-
             # Calculate Investor's Net Benefit
             final_btc_value = V0 * (1 + CAGR) ** loan_term_years
-            final_condo_value = condo_price * (1 + 0.04) ** loan_term_years  # 4% annual appreciation
+            condo_growth = _LOAN_PARAMS['condo_appreciation']
+            final_condo_value = condo_price * (1 + condo_growth) ** loan_term_years
             investors_net_benefit = final_btc_value + final_condo_value
 
-            # Prepare Net Benefit Over Time
-            years = list(range(0, loan_term_years + 1))
-            btc_values = [V0 * (1 + CAGR) ** year for year in years]
-            condo_values = [condo_price * (1 + 0.04) ** year for year in years]
-            net_benefit = [btc + condo for btc, condo in zip(btc_values, condo_values)]
+            # Prepare Net Benefit Over Time (vectorized over the years axis)
+            years = np.arange(loan_term_years + 1)
+            btc_values = V0 * np.power(1.0 + CAGR, years)
+            condo_values = condo_price * np.power(1.0 + condo_growth, years)
+            net_benefit = btc_values + condo_values
+
+            # All three charts in one figure: one plotly.js instance to init
+            st.subheader("📊 Deal Overview")
+            st.plotly_chart(
+                plot_deal_overview(
+                    tuple(schedule_df['Year']),
+                    tuple(schedule_df['Interest']),
+                    tuple(schedule_df['Principal']),
+                    profit_percentage,
+                    tuple(years),
+                    tuple(net_benefit)
+                ),
+                use_container_width=True, config=_PLOTLY_CONFIG
+            )
+
+            # Display Loan Schedule
+            st.subheader("📅 Loan Schedule")
+            st.dataframe(schedule_df, column_config={
+                "Payment": st.column_config.NumberColumn(format="$%.2f"),
+                "Interest": st.column_config.NumberColumn(format="$%.2f"),
+                "Principal": st.column_config.NumberColumn(format="$%.2f"),
+                "Remaining Balance": st.column_config.NumberColumn(format="$%.2f"),
+            })
+
+            # Display ECi's Profit
+            st.subheader("📈 ECi's Profit")
+            profit_details = {
+                "Total Payments to ECi": f"${total_payments:,.2f}",
+                "ECi's Profit": f"${profit:,.2f} ({profit_percentage}%)"
+            }
+            st.table(pd.DataFrame.from_dict(profit_details, orient='index', columns=['Value']))
 
             # Display Investor's Net Benefit
             st.subheader("💰 Investor's Net Benefit")
-            st.plotly_chart(plot_investors_net_benefit(years, net_benefit), use_container_width=True)
-            st.write(f"**Final BTC Value (after {loan_term_years} years):** ${final_btc_value:,.2f}")
-            st.write(f"**Final Condo Value (after {loan_term_years} years at 4% appreciation):** ${final_condo_value:,.2f}")
-            st.write(f"**Total Net Benefit:** ${investors_net_benefit:,.2f}")
+            benefit_details = {
+                f"Final BTC Value (after {loan_term_years} years)": f"${final_btc_value:,.2f}",
+                f"Final Condo Value (after {loan_term_years} years at 4% appreciation)": f"${final_condo_value:,.2f}",
+                "Total Net Benefit": f"${investors_net_benefit:,.2f}"
+            }
+            st.table(pd.DataFrame.from_dict(benefit_details, orient='index', columns=['Value']))
         else:
             st.error("❌ **Deal Not Accepted:** Condo price exceeds 25% of BTC holdings' value.")
             st.write(f"**Maximum Allowed Condo Cost (25% of BTC holdings' value):** ${max_condo_cost:,.2f}")